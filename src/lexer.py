@@ -5,15 +5,40 @@ Handles conversion of source code into tokens for parsing.
 
 import re
 import logging
-from enum import Enum, auto
+from sys import intern
+from array import array
+from itertools import islice
+from enum import Enum, IntEnum, auto
 from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Tuple, Any, Union
 
 logger = logging.getLogger(__name__)
 
 
-class TokenType(Enum):
+def _trie_pattern(words: Dict[str, str]) -> str:
+    """Build a prefix-factored alternation of words, each followed by its regex."""
+    branches: Dict[str, Dict[str, str]] = {}
+    for word, follow in words.items():
+        branches.setdefault(word[:1], {})[word[1:]] = follow
+    
+    alternatives = []
+    for head, rest in sorted(branches.items(), key=lambda item: (not item[0], item[0])):
+        if not head:
+            alternatives.append(rest[''])
+            continue
+        inner = _trie_pattern(rest)
+        alternatives.append(re.escape(head) + (f"(?:{inner})" if '|' in inner else inner))
+    return '|'.join(alternatives)
+
+
+class TokenType(IntEnum):
     """Token types for USCL language."""
+    __str__ = Enum.__str__
+    
+    def __format__(self, format_spec: str) -> str:
+        """Format as str() does, on every Python version."""
+        return format(str(self), format_spec)
+    
     # Literals
     INTEGER = auto()
     FLOAT = auto()
@@ -80,6 +105,8 @@ class TokenType(Enum):
 @dataclass
 class Token:
     """Represents a lexical token."""
+    __slots__ = ('type', 'value', 'line', 'column')
+    
     type: TokenType
     value: Any
     line: int
@@ -89,6 +116,74 @@ class Token:
         return f"Token({self.type.name}, {self.value!r}, {self.line}:{self.column})"
 
 
+def _compile_scanner(spec: List[Tuple[Optional[str], str]]) -> re.Pattern:
+    """Compile (group name, regex) pairs into a single alternation."""
+    # Each name is an empty marker group after its regex, so branches start
+    # with a literal and match.lastindex still names the branch. Group 1
+    # holds leading spaces and tabs; the lexeme starts at match.end(1).
+    alternatives = '|'.join(f"(?:{regex})(?P<{name}>)" if name else f"(?:{regex})"
+                            for name, regex in spec)
+    return re.compile(f"([ \t]*)(?:{alternatives})", re.DOTALL)
+
+
+# Lexeme classes of the master regex groups, dispatched on in scan().
+_SKIP = 0
+_OPERATOR = 1
+_IDENTIFIER = 2
+_NEWLINE = 3
+_KEYWORD = 4
+_NUMBER = 5
+_STRING = 6
+_ERROR = 7
+
+_GROUP_CLASSES = {
+    'SKIP': (_SKIP, None),
+    'OPERATOR': (_OPERATOR, None),
+    'IDENTIFIER': (_IDENTIFIER, TokenType.IDENTIFIER),
+    'NEWLINE': (_NEWLINE, TokenType.NEWLINE),
+    'NUMBER': (_NUMBER, TokenType.INTEGER),
+    'STRING': (_STRING, TokenType.STRING),
+    'ERROR': (_ERROR, None),
+}
+
+# Scanned type code -> TokenType member, for turning columns into Tokens.
+_TOKEN_TYPES = {int(token_type): token_type for token_type in TokenType}
+
+
+def _group_table(pattern: re.Pattern,
+                 keywords: Dict[str, TokenType]) -> Tuple[Tuple[int, Optional[TokenType]], ...]:
+    """Map each group index of pattern to its (lexeme class, token type)."""
+    table: List[Tuple[int, Optional[TokenType]]] = [(_ERROR, None)] * (pattern.groups + 1)
+    for name, index in pattern.groupindex.items():
+        if name.startswith('KEYWORD_'):
+            table[index] = (_KEYWORD, keywords[name[len('KEYWORD_'):]])
+        else:
+            table[index] = _GROUP_CLASSES[name]
+    return tuple(table)
+
+
+def _group_lexemes(pattern: re.Pattern) -> Tuple[Optional[str], ...]:
+    """Map each group index of pattern to the interned keyword it marks, if any."""
+    lexemes: List[Optional[str]] = [None] * (pattern.groups + 1)
+    for name, index in pattern.groupindex.items():
+        if name.startswith('KEYWORD_'):
+            lexemes[index] = intern(name[len('KEYWORD_'):])
+    return tuple(lexemes)
+
+
+# A backslash and the character it escapes, if the source has one.
+_ESCAPE_RE = re.compile(r"\\(.?)", re.DOTALL)
+
+# Escaped character -> decoded value; any other character escapes to itself.
+_ESCAPES = {'n': '\n', 't': '\t'}
+
+
+def _unescape(match: re.Match) -> str:
+    """Replacement for one escape sequence matched by _ESCAPE_RE."""
+    escape_char = match.group(1)
+    return _ESCAPES.get(escape_char, escape_char)
+
+
 class Lexer:
     """Lexer for USCL language."""
     
@@ -112,6 +207,63 @@ class Lexer:
         'not': TokenType.NOT,
     }
     
+    # Operator and delimiter lexemes, two-character operators before their
+    # one-character prefixes.
+    OPERATORS = {
+        '==': TokenType.EQ,
+        '!=': TokenType.NEQ,
+        '<=': TokenType.LE,
+        '>=': TokenType.GE,
+        '->': TokenType.ARROW,
+        '**': TokenType.POW,
+        '|>': TokenType.PIPE,
+        '+': TokenType.PLUS,
+        '-': TokenType.MINUS,
+        '*': TokenType.STAR,
+        '/': TokenType.SLASH,
+        '%': TokenType.PERCENT,
+        '=': TokenType.ASSIGN,
+        '<': TokenType.LT,
+        '>': TokenType.GT,
+        '|': TokenType.PIPE,
+        ':': TokenType.COLON,
+        ';': TokenType.SEMICOLON,
+        ',': TokenType.COMMA,
+        '.': TokenType.DOT,
+        '(': TokenType.LPAREN,
+        ')': TokenType.RPAREN,
+        '[': TokenType.LBRACKET,
+        ']': TokenType.RBRACKET,
+        '{': TokenType.LBRACE,
+        '}': TokenType.RBRACE,
+    }
+    
+    # Operator lexeme -> (TokenType, interned lexeme).
+    _OPERATOR_TOKENS = {operator: (token_type, intern(operator))
+                        for operator, token_type in OPERATORS.items()}
+    
+    # (group name, regex) for every lexeme, tried in order. Keywords are a
+    # prefix trie ending each one in its own KEYWORD_<keyword> group.
+    _TOKEN_SPEC = [
+        ('NEWLINE', r'\n[ \t]*(?:#[^\n]*)?'),
+        ('SKIP', r'[ \t]+(?:#[^\n]*)?|#[^\n]*'),
+        ('NUMBER', r'\d+(?:\.\d*)?'),
+        (None, _trie_pattern({keyword: rf'(?![\w?!])(?P<KEYWORD_{keyword}>)'
+                              for keyword in KEYWORDS})),
+        ('IDENTIFIER', r'[^\W\d][\w?!]*'),
+        ('STRING', r'"[^"\\]*(?:\\.[^"\\]*)*(?:"|\\?\Z)|' + r"'[^'\\]*(?:\\.[^'\\]*)*(?:'|\\?\Z)"),
+        # OPERATORS lists two-character operators before their prefixes.
+        ('OPERATOR', '|'.join(re.escape(operator) for operator in OPERATORS)),
+        ('ERROR', r'.'),
+    ]
+    
+    # Compiled once, when the class is created.
+    _MASTER_RE = _compile_scanner(_TOKEN_SPEC)
+    
+    # Group index -> (lexeme class, token type), dispatched on in scan().
+    _GROUP_TABLE = _group_table(_MASTER_RE, KEYWORDS)
+    _GROUP_LEXEMES = _group_lexemes(_MASTER_RE)
+    
     def __init__(self, source: str) -> None:
         """Initialize lexer with source code."""
         self.source = source
@@ -120,226 +272,147 @@ class Lexer:
         self.column = 1
         self.tokens: List[Token] = []
         self.indent_stack = [0]
+        # Scanned tokens as parallel columns; see scan().
+        self.token_types = array('i')
+        self.token_values: List[Any] = []
+        self.token_lines = array('i')
+        self.token_columns = array('i')
+    
+    def __len__(self) -> int:
+        """Number of tokens scanned so far."""
+        return len(self.token_types)
+    
+    def __bool__(self) -> bool:
+        """A lexer is truthy even before it has scanned any tokens."""
+        return True
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[Token, List[Token]]:
+        """Build the Token at index, or a list of Tokens for a slice, from the scanned columns."""
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return Token(_TOKEN_TYPES[self.token_types[index]], self.token_values[index],
+                     self.token_lines[index], self.token_columns[index])
         
     def tokenize(self) -> List[Token]:
         """Tokenize the entire source code."""
         logger.debug(f"Tokenizing {len(self.source)} characters")
-        while self.position < len(self.source):
-            self._skip_whitespace_and_comments()
-            if self.position >= len(self.source):
-                break
-            
-            char = self.source[self.position]
-            
-            if char == '\n':
-                self.position += 1
-                self.line += 1
-                self.column = 1
-                self.tokens.append(Token(TokenType.NEWLINE, '\n', self.line - 1, self.column))
-            elif char.isdigit():
-                self._read_number()
-            elif char.isalpha() or char == '_':
-                self._read_identifier()
-            elif char == '"' or char == "'":
-                self._read_string(char)
-            elif char == ':':
-                self._add_token(TokenType.COLON, ':')
-                self.position += 1
-                self.column += 1
-            elif char == ';':
-                self._add_token(TokenType.SEMICOLON, ';')
-                self.position += 1
-                self.column += 1
-            elif char == ',':
-                self._add_token(TokenType.COMMA, ',')
-                self.position += 1
-                self.column += 1
-            elif char == '.':
-                self._add_token(TokenType.DOT, '.')
-                self.position += 1
-                self.column += 1
-            elif char == '(':
-                self._add_token(TokenType.LPAREN, '(')
-                self.position += 1
-                self.column += 1
-            elif char == ')':
-                self._add_token(TokenType.RPAREN, ')')
-                self.position += 1
-                self.column += 1
-            elif char == '[':
-                self._add_token(TokenType.LBRACKET, '[')
-                self.position += 1
-                self.column += 1
-            elif char == ']':
-                self._add_token(TokenType.RBRACKET, ']')
-                self.position += 1
-                self.column += 1
-            elif char == '{':
-                self._add_token(TokenType.LBRACE, '{')
-                self.position += 1
-                self.column += 1
-            elif char == '}':
-                self._add_token(TokenType.RBRACE, '}')
-                self.position += 1
-                self.column += 1
-            else:
-                self._read_operator()
-        
-        self._add_token(TokenType.EOF, None)
+        # self.tokens mirrors the columns, so tokens scanned by an earlier
+        # scan() call are materialized here as well.
+        count = len(self.tokens)
+        types, values, lines, columns = self.scan()
+        self.tokens.extend(map(Token, map(_TOKEN_TYPES.__getitem__, islice(types, count, None)),
+                               islice(values, count, None), islice(lines, count, None),
+                               islice(columns, count, None)))
         logger.debug(f"Tokenized {len(self.tokens)} tokens")
         return self.tokens
     
-    def _skip_whitespace_and_comments(self) -> None:
-        """Skip whitespace and comments."""
-        while self.position < len(self.source):
-            char = self.source[self.position]
-            if char in ' \t':
-                self.position += 1
-                self.column += 1
-            elif char == '#':
-                while self.position < len(self.source) and self.source[self.position] != '\n':
-                    self.position += 1
-            else:
-                break
-    
-    def _read_number(self) -> None:
-        """Read a numeric literal."""
-        start_pos = self.position
-        start_col = self.column
-        
-        while self.position < len(self.source) and self.source[self.position].isdigit():
-            self.position += 1
-            self.column += 1
+    def scan(self) -> Tuple[array, List[Any], array, array]:
+        """Tokenize into (types, values, lines, columns) columns without building Tokens."""
+        add_type = self.token_types.append
+        add_value = self.token_values.append
+        add_line = self.token_lines.append
+        add_column = self.token_columns.append
+        group_table = self._GROUP_TABLE
+        group_lexemes = self._GROUP_LEXEMES
+        operator_tokens = self._OPERATOR_TOKENS
+        read_string = self._read_string
+        source = self.source
+        line = self.line
+        # Offset just before the current line, so a column is offset - line_base.
+        line_base = self.position - self.column
+        master_re = self._MASTER_RE
+        position = self.position
         
-        if self.position < len(self.source) and self.source[self.position] == '.':
-            self.position += 1
-            self.column += 1
-            while self.position < len(self.source) and self.source[self.position].isdigit():
-                self.position += 1
-                self.column += 1
-            value = float(self.source[start_pos:self.position])
-            self._add_token(TokenType.FLOAT, value)
-        else:
-            value = int(self.source[start_pos:self.position])
-            self._add_token(TokenType.INTEGER, value)
-    
-    def _read_identifier(self) -> None:
-        """Read an identifier or keyword."""
-        start_pos = self.position
-        start_col = self.column
-        
-        while (self.position < len(self.source) and 
-               (self.source[self.position].isalnum() or self.source[self.position] in '_?!')):
-            self.position += 1
-            self.column += 1
-        
-        value = self.source[start_pos:self.position]
-        token_type = self.KEYWORDS.get(value, TokenType.IDENTIFIER)
-        self._add_token(token_type, value)
-    
-    def _read_string(self, quote: str) -> None:
-        """Read a string literal."""
-        start_col = self.column
-        self.position += 1
-        self.column += 1
-        start_pos = self.position
-        value = ""
-        
-        while self.position < len(self.source) and self.source[self.position] != quote:
-            if self.source[self.position] == '\\':
-                self.position += 1
-                self.column += 1
-                if self.position < len(self.source):
-                    escape_char = self.source[self.position]
-                    if escape_char == 'n':
-                        value += '\n'
-                    elif escape_char == 't':
-                        value += '\t'
-                    elif escape_char == '\\':
-                        value += '\\'
+        # Literal tokens are positioned at the column just past the lexeme,
+        # operators and delimiters at the column where they start.
+        while True:
+            for match in master_re.finditer(source, position):
+                index = match.lastindex
+                lexeme_class, token_type = group_table[index]
+                
+                if lexeme_class == _OPERATOR:
+                    start = match.end(1)
+                    token_type, text = operator_tokens[source[start:match.end()]]
+                    add_type(token_type)
+                    add_value(text)
+                    add_line(line)
+                    add_column(start - line_base)
+                elif lexeme_class == _IDENTIFIER:
+                    # [^\W\d] also admits non-letter numerals such as '½'.
+                    start = match.end(1)
+                    if source[start] > 'z' and not source[start].isalpha():
+                        logger.warning(f"Unknown character: {source[start]} at "
+                                       f"{line}:{start - line_base}")
+                        position = start + 1
+                        break
+                    end = match.end()
+                    add_type(token_type)
+                    add_value(intern(source[start:end]))
+                    add_line(line)
+                    add_column(end - line_base)
+                elif lexeme_class == _NEWLINE:
+                    add_type(token_type)
+                    add_value('\n')
+                    add_line(line)
+                    add_column(1)
+                    line += 1
+                    line_base = match.end(1)
+                elif lexeme_class == _KEYWORD:
+                    add_type(token_type)
+                    add_value(group_lexemes[index])
+                    add_line(line)
+                    add_column(match.end() - line_base)
+                elif lexeme_class == _SKIP:
+                    continue
+                elif lexeme_class == _NUMBER:
+                    # One pass over the digits; a '.' in the match makes it a float.
+                    end = match.end()
+                    text = source[match.end(1):end]
+                    if '.' in text:
+                        add_type(TokenType.FLOAT)
+                        add_value(float(text))
                     else:
-                        value += escape_char
+                        add_type(token_type)
+                        add_value(int(text))
+                    add_line(line)
+                    add_column(end - line_base)
+                elif lexeme_class == _STRING:
+                    end = match.end()
+                    add_type(token_type)
+                    add_value(read_string(source[match.end(1):end]))
+                    add_line(line)
+                    add_column(end - line_base)
+                else:
+                    start = match.end(1)
+                    logger.warning(f"Unknown character: {source[start]} at "
+                                   f"{line}:{start - line_base}")
             else:
-                value += self.source[self.position]
-            
-            self.position += 1
-            self.column += 1
-        
-        if self.position < len(self.source):
-            self.position += 1
-            self.column += 1
+                break
         
-        self._add_token(TokenType.STRING, value)
+        self.position = len(source)
+        self.line = line
+        self.column = self.position - line_base
+        self._add_token(TokenType.EOF, None)
+        return self.token_types, self.token_values, self.token_lines, self.token_columns
     
-    def _read_operator(self) -> None:
-        """Read an operator."""
-        char = self.source[self.position]
-        
-        if self.position + 1 < len(self.source):
-            two_char = self.source[self.position:self.position+2]
-            if two_char == '==':
-                self._add_token(TokenType.EQ, '==')
-                self.position += 2
-                self.column += 2
-                return
-            elif two_char == '!=':
-                self._add_token(TokenType.NEQ, '!=')
-                self.position += 2
-                self.column += 2
-                return
-            elif two_char == '<=':
-                self._add_token(TokenType.LE, '<=')
-                self.position += 2
-                self.column += 2
-                return
-            elif two_char == '>=':
-                self._add_token(TokenType.GE, '>=')
-                self.position += 2
-                self.column += 2
-                return
-            elif two_char == '->':
-                self._add_token(TokenType.ARROW, '->')
-                self.position += 2
-                self.column += 2
-                return
-            elif two_char == '**':
-                self._add_token(TokenType.POW, '**')
-                self.position += 2
-                self.column += 2
-                return
-            elif two_char == '|>':
-                self._add_token(TokenType.PIPE, '|>')
-                self.position += 2
-                self.column += 2
-                return
-        
-        if char == '+':
-            self._add_token(TokenType.PLUS, '+')
-        elif char == '-':
-            self._add_token(TokenType.MINUS, '-')
-        elif char == '*':
-            self._add_token(TokenType.STAR, '*')
-        elif char == '/':
-            self._add_token(TokenType.SLASH, '/')
-        elif char == '%':
-            self._add_token(TokenType.PERCENT, '%')
-        elif char == '=':
-            self._add_token(TokenType.ASSIGN, '=')
-        elif char == '<':
-            self._add_token(TokenType.LT, '<')
-        elif char == '>':
-            self._add_token(TokenType.GT, '>')
-        elif char == '|':
-            self._add_token(TokenType.PIPE, '|')
-        else:
-            logger.warning(f"Unknown character: {char} at {self.line}:{self.column}")
+    def _read_string(self, text: str) -> str:
+        """Decode the escapes of a matched string literal, quotes included."""
+        quote = text[0]
+        if '\\' not in text:
+            return text[1:-1] if len(text) > 1 and text[-1] == quote else text[1:]
         
-        self.position += 1
-        self.column += 1
+        body = text[1:]
+        # The literal is closed if its final quote is not itself escaped.
+        if body[-1:] == quote and (len(body) - 1 - len(body[:-1].rstrip('\\'))) % 2 == 0:
+            body = body[:-1]
+        return _ESCAPE_RE.sub(_unescape, body)
     
     def _add_token(self, token_type: TokenType, value: Any) -> None:
-        """Add a token to the token list."""
-        self.tokens.append(Token(token_type, value, self.line, self.column))
+        """Add a token at the current position to the scanned columns."""
+        self.token_types.append(token_type)
+        self.token_values.append(value)
+        self.token_lines.append(self.line)
+        self.token_columns.append(self.column)
 
 
 if __name__ == '__main__':